@@ -1,3 +1,4 @@
+from copy import copy
 from datetime import datetime
 from os import access
 from symbol import sym_name
@@ -6,19 +7,25 @@ from config import Config, Op
 from order import Order
 from instrument import Symbol
 from typing import List, Dict, Union
+from uuid import uuid4
 import pandas as pd
 
 class Account:
+    # The attributes not captured by Account.snapshot(), the market data and the ledger are shared, the order lists are handled separately
+    shared: List[str] = ["broker", "symbol", "df", "orders", "history"]
+
     def __init__(self, broker: Broker, symbol: Symbol) -> None:
         '''
         Account(): Initialize a new account object with the desire trading symbol
         '''
         self.broker: Broker = broker
         self.symbol: Symbol = symbol
-        self.df: pd.DataFrame = pd.DataFrame(0.00, columns=Config.account["fields"], index=self.broker.dt)
-        self.df.balance = Config.account["balance"]
-        self.df.equity = Config.account["balance"]
-        self.df.margin_free = Config.account["balance"]
+
+        # The position of broker.dt where the episode of the account starts
+        self.start: int = self.broker.shift
+        self.df: pd.DataFrame = pd.DataFrame(0.00, columns=Config.account["fields"], index=self.broker.dt, dtype=Config.dtype["account"])
+        # writing into the existing columns, so the ledger keeps the dtype of Config.dtype["account"]
+        self.df.loc[:, ["balance", "equity", "margin_free"]] = Config.account["balance"]
         self.orders: List[Order] = []
         self.history: List[Order] = []
         self.balance: float = Config.account["balance"]
@@ -33,6 +40,7 @@ class Account:
         self.loss_count: int = 0
         self.break_even: int = 0
         self.last_pnl: float = 0
+        self.total_orders: int = 0
         
     def action(self, action: Op, lots: float = 0, applied_price: str = "open") -> None:
         '''
@@ -84,18 +92,27 @@ class Account:
         self.loss_count = sum(1 for o in self.history if o.pnl < 0)
         self.break_even = len(self.history) - self.win_count - self.loss_count
 
-        self.df.iloc[self.broker.shift].balance = self.balance
-        self.df.iloc[self.broker.shift].equity = self.equity
-        self.df.iloc[self.broker.shift].last_pnl = self.last_pnl
-        self.df.iloc[self.broker.shift].total_orders = self.total_orders
-        self.df.iloc[self.broker.shift].margin_hold = self.margin_hold
-        self.df.iloc[self.broker.shift].margin_free = self.margin_free
-        self.df.iloc[self.broker.shift].max_fl = self.max_fl
-        self.df.iloc[self.broker.shift].max_fp = self.max_fp
-        self.df.iloc[self.broker.shift].max_dd = self.max_dd
-        self.df.iloc[self.broker.shift].win_count = self.win_count
-        self.df.iloc[self.broker.shift].loss_count = self.loss_count
-        self.df.iloc[self.broker.shift].break_even = self.break_even
+        self.write_ledger()
+
+    def write_ledger(self) -> None:
+        '''
+        Account.write_ledger(): writing the accumulators into the ledger row of the current timestep
+        '''
+        ledger: Dict = {
+            "balance": self.balance,
+            "equity": self.equity,
+            "last_pnl": self.last_pnl,
+            "total_orders": self.total_orders,
+            "margin_hold": self.margin_hold,
+            "margin_free": self.margin_free,
+            "max_fl": self.max_fl,
+            "max_fp": self.max_fp,
+            "max_dd": self.max_dd,
+            "win_counts": self.win_count,
+            "loss_count": self.loss_count,
+            "break_even": self.break_even}
+        # writing the whole row in one positional assignment, so the values are stored into the ledger instead of a temporary copy
+        self.df.iloc[self.broker.shift] = [ledger[f] for f in self.df.columns]
 
     def info(self) -> Dict:
         result: Dict = {
@@ -120,8 +137,39 @@ class Account:
         tmp: List[Dict] = [o.info() for o in self.history]
         orders: pd.DataFrame = pd.DataFrame(tmp)
         #print(orders)
-        orders.to_csv(f"./record/Order-{name}-{id}-{datetime.now():m%d%H%M}.csv")
-        self.df.to_csv(f"./record/Account-{name}-{id}-{datetime.now():%m%d%H%M}.csv")
+        # the order and account files share the same suffix, so the analytics module can pair them,
+        # the uuid keeps the suffix unique among the envs saving to the same folder at the same time (e.g. the sweep runner workers)
+        suffix: str = f"{name}-{id}-{datetime.now():%m%d%H%M}-{uuid4().hex[:8]}"
+        orders.to_csv(f"./record/Order-{suffix}.csv")
+        self.get_ledger().to_csv(f"./record/Account-{suffix}.csv")
+
+    def snapshot(self) -> Dict:
+        '''
+        Account.snapshot() -> Dict: capturing the mutable state of the account, i.e. the accumulators, copies of the open orders and a shallow copy of the history.
+        The ledger (Account.df) is not copied, Account.restore() rewrites the row of the restored timestep and the later rows are overwritten once the account moves forward again
+        '''
+        result: Dict = {k: v for k, v in self.__dict__.items() if k not in Account.shared}
+        result["orders"] = [copy(o) for o in self.orders]
+        # the closed orders are immutable, copying the list only copies the pointers
+        result["history"] = list(self.history)
+        return result
+
+    def restore(self, state: Dict) -> None:
+        '''
+        Account.restore(state: Dict): restoring the state captured by Account.snapshot(), the same state can be restored many times
+        '''
+        self.__dict__.update({k: v for k, v in state.items() if k not in Account.shared})
+        self.orders = [copy(o) for o in state["orders"]]
+        # the history may have been changed by another branch after the snapshot, so it is replaced instead of truncated
+        self.history = list(state["history"])
+        # the ledger is shared among the branches, the row of the restored timestep may hold the values of another branch
+        self.write_ledger()
+
+    def get_ledger(self) -> pd.DataFrame:
+        '''
+        Account.get_ledger() -> pd.DataFrame: the account movement from the start of the episode to the current timestep
+        '''
+        return self.df.iloc[self.start:self.broker.shift+1]
 
     def get_features(self, features: List[str], window_size = 1) -> Union[pd.DataFrame, pd.Series]:
         '''
@@ -0,0 +1,144 @@
+from config import Config
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from os import path
+from typing import List, Dict, Tuple, TYPE_CHECKING
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+# The account is only needed for the annotation, evaluating the saved csv files needs numpy and pandas only
+if TYPE_CHECKING:
+    from account import Account
+
+# The number of trading days in a year for annualizing the ratios
+TRADING_DAYS: int = 260
+
+
+def get_periods(index: pd.DatetimeIndex) -> float:
+    '''
+    get_periods(index: pd.DatetimeIndex) -> float: the number of bars in a year, inferred from the median bar interval
+    '''
+    if len(index) < 2:
+        return 1.0
+    minutes: float = np.median(np.diff(index.values).astype("timedelta64[s]").astype(float)) / 60
+    return TRADING_DAYS * 24 * 60 / minutes if minutes > 0 else 1.0
+
+
+def get_ratios(returns: np.ndarray, periods: float = 1.0) -> Tuple[float, float]:
+    '''
+    get_ratios(returns: np.ndarray, periods: float) -> Tuple[float, float]: the annualized Sharpe and Sortino ratios of the bar returns
+    '''
+    if len(returns) < 2:
+        return 0.0, 0.0
+    mean: float = returns.mean()
+    std: float = returns.std(ddof=1)
+    downside: float = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    sharpe: float = mean / std * np.sqrt(periods) if std > 0 else 0.0
+    sortino: float = mean / downside * np.sqrt(periods) if downside > 0 else 0.0
+    return sharpe, sortino
+
+
+def get_drawdown(equity: np.ndarray) -> Tuple[float, int]:
+    '''
+    get_drawdown(equity: np.ndarray) -> Tuple[float, int]: the peak to trough maximum drawdown (in fraction of the peak)
+    and the longest duration (in bars) of the equity staying below its previous peak
+    '''
+    if len(equity) == 0:
+        return 0.0, 0
+    peak: np.ndarray = np.maximum.accumulate(equity)
+    dd: np.ndarray = (peak - equity) / peak
+    underwater: np.ndarray = equity < peak
+    # the length of each underwater run: counting the bars since the last bar at the peak
+    idx: np.ndarray = np.arange(len(equity))
+    last_peak: np.ndarray = np.maximum.accumulate(np.where(underwater, 0, idx))
+    duration: np.ndarray = np.where(underwater, idx - last_peak, 0)
+    return float(dd.max()), int(duration.max())
+
+
+def get_trade_stats(pnl: np.ndarray) -> Dict:
+    '''
+    get_trade_stats(pnl: np.ndarray) -> Dict: the profit factor, expectancy and win rate of the closed orders
+    '''
+    profit: float = pnl[pnl > 0].sum()
+    loss: float = -pnl[pnl < 0].sum()
+    result: Dict = {
+        "trades": len(pnl),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) > 0 else 0.0,
+        "profit_factor": float(profit / loss) if loss > 0 else (np.inf if profit > 0 else 0.0),
+        "expectancy": float(pnl.mean()) if len(pnl) > 0 else 0.0}
+    return result
+
+
+def evaluate(account: pd.DataFrame, orders: pd.DataFrame) -> Dict:
+    '''
+    evaluate(account: pd.DataFrame, orders: pd.DataFrame) -> Dict: the performance of an episode
+    account: pd.DataFrame -> the account ledger of the episode (Account.df), it needs the equity and total_orders columns
+    orders: pd.DataFrame -> the closed orders of the episode (Order.info()), it needs the pnl and lot_size columns
+    '''
+    equity: np.ndarray = account["equity"].to_numpy(dtype=np.float64)
+    returns: np.ndarray = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(0)
+    sharpe, sortino = get_ratios(returns, get_periods(account.index))
+    max_dd, dd_duration = get_drawdown(equity)
+    pnl: np.ndarray = orders["pnl"].to_numpy(dtype=np.float64) if "pnl" in orders.columns else np.zeros(0)
+    lots: np.ndarray = orders["lot_size"].to_numpy(dtype=np.float64) if "lot_size" in orders.columns else np.zeros(0)
+
+    result: Dict = {
+        "bars": len(equity),
+        "return": float(equity[-1] / equity[0] - 1) if len(equity) > 0 else 0.0,
+        "sharpe": float(sharpe),
+        "sortino": float(sortino),
+        "max_dd": max_dd,
+        "dd_duration": dd_duration,
+        # the fraction of bars holding any order
+        "exposure": float((account["total_orders"].to_numpy() > 0).mean()) if len(equity) > 0 else 0.0,
+        # the lots traded (opening and closing) per bar
+        "turnover": float(2 * lots.sum() / len(equity)) if len(equity) > 0 else 0.0,
+        **get_trade_stats(pnl)}
+    return result
+
+
+def from_account(account: "Account") -> Dict:
+    '''
+    from_account(account: Account) -> Dict: the performance of the current episode of the account
+    '''
+    orders: pd.DataFrame = pd.DataFrame([o.info() for o in account.history], columns=["pnl", "lot_size"])
+    return evaluate(account.get_ledger(), orders)
+
+
+def load_episode(files: Tuple[str, str]) -> Dict:
+    '''
+    load_episode(files: Tuple[str, str]) -> Dict: evaluating an episode saved by Account.save, files are the account and order csv files
+    '''
+    dt: str = Config.fields["dt"]
+    account: pd.DataFrame = pd.read_csv(files[0], usecols=[dt, "equity", "total_orders"], index_col=dt, parse_dates=[dt])
+    orders: pd.DataFrame = pd.read_csv(files[1], usecols=lambda x: x in ["pnl", "lot_size"])
+    result: Dict = evaluate(account, orders)
+    result["episode"] = path.basename(files[0])[len("Account-"):-len(".csv")]
+    return result
+
+
+def get_episodes(record: str = "./record") -> List[Tuple[str, str]]:
+    '''
+    get_episodes(record: str) -> List[Tuple[str, str]]: pairing the account and order csv files saved by Account.save
+    '''
+    result: List[Tuple[str, str]] = []
+    for account in sorted(glob(path.join(record, "Account-*.csv"))):
+        orders: str = path.join(path.dirname(account), "Order-" + path.basename(account)[len("Account-"):])
+        if path.exists(orders):
+            result.append((account, orders))
+    return result
+
+
+def batch_evaluate(record: str = "./record", workers: int = 0) -> pd.DataFrame:
+    '''
+    batch_evaluate(record: str, workers: int) -> pd.DataFrame: evaluating all the episodes saved in the record folder in parallel
+    workers: int -> the number of processes, 0 means cpu_count()
+    '''
+    episodes: List[Tuple[str, str]] = get_episodes(record)
+    if len(episodes) == 0:
+        return pd.DataFrame()
+    workers = workers or mp.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        result: List[Dict] = list(pool.map(load_episode, episodes, chunksize=max(1, len(episodes) // (workers * 4))))
+    return pd.DataFrame(result).set_index("episode")
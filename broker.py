@@ -1,4 +1,4 @@
-from config import Config
+from config import Config, GapPolicy
 from os import path
 from typing import List, Dict
 import pandas as pd
@@ -16,6 +16,9 @@ class Broker:
             
         # The price data for each symbol
         self.data: List[Dict] = []
+
+        # The number of bars of each symbol in the csv file, and the bars dropped or filled in aligning the symbols
+        self.gap_report: Dict[str, Dict] = {}
         
         # Reading all price data from the csv
         self.pre_process()
@@ -40,26 +43,88 @@ class Broker:
         mapped_fields = {v: k for k, v in Config.fields.items()}
         df.rename(columns=mapped_fields, inplace=True)
         
-        # Extracting the unique datetime index
-        self.dt = df.index.unique().copy()
-        
+        # Grouping the rows once: sorting by symbol and datetime, then splitting at the symbol boundaries
+        codes, symbols = pd.factorize(df.symbol)
+        dt: np.ndarray = df.index.values
+        order: np.ndarray = np.lexsort((dt, codes))
+        codes, dt = codes[order], dt[order]
+
+        # Keeping the last row of any duplicated datetime within a symbol
+        keep: np.ndarray = np.ones(len(order), dtype=bool)
+        keep[:-1] = (codes[1:] != codes[:-1]) | (dt[1:] != dt[:-1])
+        order, codes, dt = order[keep], codes[keep], dt[keep]
+        bounds: np.ndarray = np.flatnonzero(np.diff(codes)) + 1
+
         # Extracting all symbols contained in the csv file
-        self.symbols = df.symbol.unique().tolist()
-        
-        # Separating the prices data for each symbol and making each symbol is in sync. manner
-        for symbol in self.symbols:
-            self.data.append({
-                "symbol": symbol,
-                "df": df[df.symbol == symbol].copy(deep=True)})
+        self.symbols = symbols.tolist()
+
+        # Intersecting or uniting the datetime of all symbols in one pass
+        values, counts = np.unique(dt, return_counts=True)
+        policy: GapPolicy = Config.alignment["policy"]
+        if policy == GapPolicy.INTERSECT:
+            values = values[counts == len(self.symbols)]
+        self.dt = pd.DatetimeIndex(values, name=df.index.name)
+
+        for symbol, rows in zip(self.symbols, np.split(order, bounds)):
+            tmp: pd.DataFrame = df.iloc[rows].reindex(self.dt)
+            self.data.append({"symbol": symbol, "df": tmp})
+            self.gap_report[symbol] = {"bars": len(rows), "dropped": 0, "filled": 0}
+
+        if policy != GapPolicy.INTERSECT:
+            self.fill_gaps(None if policy == GapPolicy.MASK else Config.alignment["ffill_limit"], policy == GapPolicy.MASK)
+
+        else:
+            for d in self.data:
+                self.gap_report[d["symbol"]]["dropped"] = self.gap_report[d["symbol"]]["bars"] - len(self.dt)
 
-            self.dt = self.dt.drop(self.dt.difference(self.data[-1]["df"].index).to_list())
-        
         for d in self.data:
-            d["df"] = d["df"].reindex(self.dt)
-            d["df"] = d["df"].set_index(self.dt)
-    
-    
-    
+            d["df"] = self.set_dtype(d["df"])
+
+    def fill_gaps(self, limit: int = None, mask: bool = False) -> None:
+        '''
+        Broker.fill_gaps(limit: int, mask: bool): filling the missing bars of each symbol with flat bars at the last close
+        limit: int -> the maximum number of consecutive bars to fill, the bars still missing in any symbol are dropped, None means no limit
+        mask: bool -> adding the "mask" feature (1: real bar, 0: filled bar) and keeping the bars before the first bar of a symbol
+        '''
+        valid: np.ndarray = np.ones(len(self.dt), dtype=bool)
+        gaps: List[np.ndarray] = []
+        for d in self.data:
+            tmp: pd.DataFrame = d["df"]
+            missing: np.ndarray = tmp.close.isna().to_numpy()
+            gaps.append(missing)
+            tmp = tmp.ffill(limit=limit)
+            close: np.ndarray = tmp.close.to_numpy()
+            for col in ["open", "high", "low"]:
+                tmp[col] = np.where(missing, close, tmp[col].to_numpy())
+            if "vol" in tmp.columns:
+                tmp["vol"] = np.where(missing, 0, tmp["vol"].to_numpy())
+            if mask:
+                tmp["mask"] = (~missing).astype(float)
+            else:
+                valid &= tmp.close.notna().to_numpy()
+            d["df"] = tmp
+
+        if mask:
+            valid[:] = True
+        else:
+            self.dt = self.dt[valid]
+
+        for d, missing in zip(self.data, gaps):
+            d["df"] = d["df"][valid]
+            report: Dict = self.gap_report[d["symbol"]]
+            report["filled"] = int(d["df"].close.notna().sum() - (~missing[valid]).sum())
+            report["dropped"] = int(report["bars"] - (~missing[valid]).sum())
+
+    def set_dtype(self, df: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Broker.set_dtype(df: pd.DataFrame) -> pd.DataFrame: casting the numeric columns to the dtypes specified in Config.dtype,
+        the prices in Config.dtype["precise_fields"] keep the precise dtype for the pnl computation, all others use the compact feature dtype
+        '''
+        dtypes: Dict = {}
+        for col in df.select_dtypes(include="number").columns:
+            dtypes[col] = Config.dtype["precise"] if col in Config.dtype["precise_fields"] else Config.dtype["feature"]
+        return df.astype(dtypes, copy=False)
+
     def post_process(self) -> None:
         '''
         Broker.post_process(): find and move to the first valid price data after adding any features to the dataset
@@ -103,8 +168,9 @@ class Broker:
 
         idx: int = self.symbols.index(symbol)
         assert self.symbols[idx] == self.data[idx]["symbol"], "Invalid symbol"
-        tmp: pd.DataFrame = self.data[idx]["df"].copy()
+        tmp: pd.DataFrame = self.data[idx]["df"]
 
+        # selecting the columns returns a new frame, the stored data will not be modified by the caller
         tmp = tmp[tmp.columns.difference(excludes)]
         if len(features)>0:
             tmp = tmp[features]
@@ -137,5 +203,6 @@ class Broker:
         if feature_name == "":
             feature_name = features.name
         
-        self.data[idx]["df"][feature_name] = features
+        dtype: str = Config.dtype["precise"] if feature_name in Config.dtype["precise_fields"] else Config.dtype["feature"]
+        self.data[idx]["df"][feature_name] = features.astype(dtype)
     
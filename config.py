@@ -12,6 +12,23 @@ class SpreadMode(IntEnum):
     FIXED = 3
     SESSIONAL = 4
 
+class GapPolicy(IntEnum):
+    INTERSECT = 0
+    FFILL = 1
+    MASK = 2
+
+class NormMode(IntEnum):
+    NONE = 0
+    ROLLING = 1
+    RUNNING = 2
+
+class RewardMode(IntEnum):
+    EQUITY_DELTA = 0
+    LOG_RETURN = 1
+    DIFF_SHARPE = 2
+    DRAWDOWN = 3
+    REALIZED_PNL = 4
+
 class Op(IntEnum):
     LONG = 0
     SHORT = 1
@@ -76,6 +93,24 @@ class Config:
         "fixed_pt_value" : 1
     }]
 
+    alignment: Dict = {
+        # INTERSECT: keep only the bars exist in all symbols
+        # FFILL: fill the missing bars with the last close, the bars still missing after ffill_limit bars are dropped
+        # MASK: keep all bars, fill the missing bars with the last close and add a "mask" feature (1: real bar, 0: filled bar)
+        "policy": GapPolicy.INTERSECT,
+        "ffill_limit": 3
+    }
+
+    dtype: Dict = {
+        # prices which are needed in the pnl, spread and margin computation
+        "precise_fields": ["open", "high", "low", "close", "bid", "ask", "spread"],
+        "precise": "float64",
+        # all other numeric columns in the broker, i.e. volume and the added features
+        "feature": "float32",
+        "observation": "float32",
+        "account": "float64"
+    }
+
     account: Dict = {
         "balance": 10000.00,
         "stop_out": 0.5,
@@ -88,6 +123,34 @@ class Config:
         "allow_multi_orders": False,
         "obs_price_features": [],
         "obs_price_exclude": ["tf", "symbol", "bid", "ask"],
+        # ROLLING: observing the rolling z-score columns added by Symbol.add_zscore, RUNNING: normalizing with the running mean and variance
+        "obs_normalize": NormMode.NONE,
+        "norm_window": 100,
+        "norm_clip": 10.0,
+        "reward": RewardMode.EQUITY_DELTA,
+        # eta: the adaption rate of DIFF_SHARPE, penalty: the drawdown penalty of DRAWDOWN
+        "reward_params": {"eta": 0.01, "penalty": 1.0},
         #"obs_account_features": ["balance", "equity", "total_orders", "margin_hold", "margin_free", "max_fl", "max_fp", "win_counts", "loss_count", "break_even"]
         "obs_account_features": ["balance", "equity", "win_counts", "loss_count", "break_even"]
     }
+
+    runner: Dict = {
+        "results": "./record/sweep.jsonl",
+        "models": "./record/models",
+        # 0 means using all cores, i.e. cpu_count() // threads_per_worker
+        "workers": 0,
+        "threads_per_worker": 1,
+        "folds": 4,
+        # True: the training window grows from the first bar (anchored), False: rolling training window
+        "anchored": True,
+        "total_timesteps": 10000,
+        "seed": 0,
+        "grid": {
+            "symbol": ["EURUSD"],
+            "algorithm": ["A2C"],
+            "window_size": [4, 12],
+            "spread_mode": [SpreadMode.IGNORE],
+            # the features are the Symbol.add_xxx methods, e.g. "ema" calls Symbol.add_ema()
+            "features": [[], ["ema", "roc"]]
+        }
+    }
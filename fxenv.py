@@ -1,10 +1,13 @@
 from account import Account
 from broker import Broker
-from config import Config, Op
+from config import Config, NormMode, Op
 from gym.spaces.discrete import Discrete
 from instrument import Symbol
-from typing import Dict, List, Tuple
+from normalizer import RunningNormalizer
+from reward import RewardScheme, get_reward_scheme
+from typing import Dict, List, NamedTuple, Tuple
 from gym import spaces
+from copy import copy
 import gym
 import numpy as np
 import pandas as pd
@@ -12,37 +15,85 @@ import talib as ta
 
 from order import Order
 
+class EnvSnapshot(NamedTuple):
+    '''
+    EnvSnapshot: the mutable episode state of FxEnv captured by FxEnv.snapshot(), the market data in the broker is shared
+    '''
+    shift: int
+    order_id: int
+    account: Account
+    account_state: Dict
+    reward_scheme: RewardScheme
+    norm_state: Tuple
+    norm_shift: int
+    done: bool
+    total_rewards: float
+
+
 class FxEnv(gym.Env):
     metadata = {'reder.mode': ['human']}
 
-    def __init__(self, broker: Broker, symbol: Symbol, window_size: int = 12) -> None:
+    def __init__(self, broker: Broker, symbol: Symbol, window_size: int = 12, start: int = 0, end: int = -1) -> None:
+        '''
+        FxEnv(broker: Broker, symbol: Symbol, window_size: int, start: int, end: int)
+        start: int -> the first position of the episode in broker.dt, it is pushed forward until there are enough valid data for the window
+        end: int -> the last position of the episode in broker.dt, default value -1 means the end of the dataset
+        '''
         self.cycle: int = 0
         self.broker: Broker = broker
         self.symbol: Symbol = symbol
         
         self.window_size: int = window_size
         self.symbol.set_spread()
+
+        # The price features in the observation, empty list means all features except Config.env["obs_price_exclude"]
+        self.obs_features: List[str] = []
+        if Config.env["obs_normalize"] == NormMode.ROLLING:
+            tmp: pd.DataFrame = self.broker.get_data(symbol = self.symbol.info["name"], excludes = Config.env["obs_price_exclude"])
+            self.obs_features = self.symbol.add_zscore(tmp.columns.tolist(), Config.env["norm_window"])
+            assert len(set(self.obs_features) & set(Config.env["obs_price_exclude"])) == 0, "The z-score features are excluded by obs_price_exclude"
         self.broker.post_process()
-        self.broker.move(window_size*3+1)
+
+        # The first position where all the prices and features are valid
+        self.first_valid: int = self.broker.shift
+        self.set_range(start, end)
+        self.broker.move(self.start)
         
         self.account: Account = Account(broker = broker, symbol = symbol)
 
+        # The running normalizer is kept across the episodes, it can be frozen and saved with the model
+        self.normalizer: RunningNormalizer = None
+        self.norm_shift: int = -1
+        if Config.env["obs_normalize"] == NormMode.RUNNING:
+            tmp: pd.Series = self.broker.get_data(symbol = self.symbol.info["name"], window_size = 1, excludes = Config.env["obs_price_exclude"])
+            self.normalizer = RunningNormalizer(len(tmp), clip = Config.env["norm_clip"], dtype = Config.dtype["observation"])
+
         tmp: int = int((symbol.info["max_lot"]-symbol.info["min_lot"])/symbol.info["lot_step"])
         self.action_space: spaces.Discrete = spaces.Discrete(3)
         self.observation_space: spaces.Box = spaces.Box(
             low=-np.inf,
             high=np.inf,
-            shape=self.get_observation().shape)
+            shape=self.get_observation().shape,
+            dtype=np.dtype(Config.dtype["observation"]))
 
+        self.reward_scheme: RewardScheme = get_reward_scheme(Config.env["reward"], Config.env["reward_params"])
         self.done: bool = False
         self.total_rewards: float = 0
         self.reset()
         
 
+    def set_range(self, start: int = 0, end: int = -1) -> None:
+        '''
+        FxEnv.set_range(start: int, end: int): restrict the episodes to a slice of broker.dt, e.g. a walk-forward fold
+        '''
+        self.start: int = max(start, self.first_valid + self.window_size, self.window_size*3+1)
+        self.end: int = len(self.broker.dt) - 1 if end < 0 else min(end, len(self.broker.dt) - 1)
+        assert self.start < self.end, "Not enough data for the episode range"
+
     def is_done(self) -> bool:
         result: bool = False
         
-        if self.broker.shift >= len(self.broker.dt) -1:
+        if self.broker.shift >= self.end:
             result = True
         
         curr: pd.Series = self.account.df.iloc[self.broker.shift]
@@ -64,10 +115,18 @@ class FxEnv(gym.Env):
             symbol = self.symbol.info["name"], 
             window_size = self.window_size, 
             #features = Config.env["obs_price_features"], 
+            features = self.obs_features,
             excludes = Config.env["obs_price_exclude"])
             
         account_features = self.account.get_features(Config.env["obs_account_features"])
-        result = price_features.to_numpy().flatten()
+        result = price_features.to_numpy(dtype=Config.dtype["observation"])
+        if self.normalizer is not None:
+            # updating the statistics with the latest bar only once, then normalizing the whole window
+            if self.norm_shift != self.broker.shift:
+                self.normalizer.update(result.reshape(-1, self.normalizer.size)[-1])
+                self.norm_shift = self.broker.shift
+            result = self.normalizer.normalize(result)
+        result = result.flatten()
         #result = np.append(result, account_features.to_numpy())
         #print(self.broker.shift)
         #print(result.shape)
@@ -85,8 +144,7 @@ class FxEnv(gym.Env):
         else:
             self.account.action(Op.CLOSEALL)
         obs = self.get_observation()
-        reward = (self.account.df.iloc[self.broker.shift]["equity"] - self.account.df.iloc[self.broker.shift-1]["equity"])/self.account.df.iloc[self.broker.shift]['equity']
-        #reward: float = self.compute_rewards()
+        reward: float = self.reward_scheme.get_reward(self.account)
         self.total_rewards += reward
 
         
@@ -101,24 +159,51 @@ class FxEnv(gym.Env):
         
         self.total_rewards = 0
         self.done = False
-        self.broker.move(self.window_size*3+1)
-        self.account.save(self.symbol.info["name"], self.cycle)
+        # saving the finished episode before moving the broker back to the start
+        if self.broker.shift > self.account.start:
+            self.account.save(self.symbol.info["name"], self.cycle)
+        self.broker.move(self.start)
         self.account = Account(broker = self.broker, symbol = self.symbol)
+        self.reward_scheme.reset(self.account)
         Order.id = 0
         self.cycle += 1
         
         return self.get_observation()
         
+    def snapshot(self) -> EnvSnapshot:
+        '''
+        FxEnv.snapshot() -> EnvSnapshot: capturing the mutable episode state (broker shift, account, open orders, reward and normalizer state),
+        so the env can be branched for lookahead search or counterfactual evaluation without copying the price data
+        '''
+        return EnvSnapshot(
+            shift = self.broker.shift,
+            order_id = Order.id,
+            account = self.account,
+            account_state = self.account.snapshot(),
+            reward_scheme = copy(self.reward_scheme),
+            norm_state = None if self.normalizer is None or self.normalizer.frozen else self.normalizer.get_state(),
+            norm_shift = self.norm_shift,
+            done = self.done,
+            total_rewards = self.total_rewards)
+
+    def restore(self, snapshot: EnvSnapshot) -> None:
+        '''
+        FxEnv.restore(snapshot: EnvSnapshot): restoring the state captured by FxEnv.snapshot(), the same snapshot can be restored many times
+        '''
+        self.broker.move(snapshot.shift)
+        Order.id = snapshot.order_id
+        self.account = snapshot.account
+        self.account.restore(snapshot.account_state)
+        self.reward_scheme = copy(snapshot.reward_scheme)
+        if snapshot.norm_state is not None:
+            self.normalizer.set_state(snapshot.norm_state)
+        self.norm_shift = snapshot.norm_shift
+        self.done = snapshot.done
+        self.total_rewards = snapshot.total_rewards
+
     def render(self) -> None:
         acc = self.account.info()
         print(acc)
-        #self.compute_rewards()
 
     def close(self) -> None:
         return super().close()
-
-    def compute_rewards(self) -> float:
-        tmp: List[Order] = self.account.history+self.account.orders
-        pctChange: List[float] = [(b.pnl-a.pnl)/a.pnl for a, b in list(zip(tmp[::1], tmp[1::1]))]
-        r = np.array([x+1 for x in pctChange[-self.window_size:]]).cumprod() - 1
-        return 0 if len(r) < 1 else r[-1]
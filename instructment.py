@@ -29,6 +29,11 @@ class Symbol:
 
         # initialize the sessional_spread to None
         self.sessional_spread: SessionalSpread = None
+
+        # the rollover multiplier of each bar and its cumulative sum, see Instructment.set_rollover()
+        self.rollover: np.ndarray = None
+        self.swap_units: np.ndarray = None
+        self.set_rollover()
         
         '''
         The following are example to illustrate adding the features for the symbol
@@ -55,6 +60,20 @@ class Symbol:
             result = Config.account["currency"]
         return result
 
+    def set_rollover(self) -> None:
+        '''
+        Instructment.set_rollover(): computing the rollover calendar over broker.dt once.
+        The rollover happens at the midnight of the broker time, every weekday rolled out of charges 1 swap and the swap_day charges 3 (covering the weekend).
+        The days without data (e.g. a gap in the data) are still charged. The swap of an order is (swap_units[current bar] - swap_units[open bar]) * swap rate * lots
+        '''
+        # the swap day must be a business day (Monday 0 to Friday 4), otherwise it is not counted as a rollover and not charged triple
+        assert 0 <= self.info["swap_day"] <= 4, "Invalid swap day"
+        days: np.ndarray = self.broker.dt.values.astype("datetime64[D]")
+        swap_day: str = "".join("1" if i == self.info["swap_day"] else "0" for i in range(7))
+        self.rollover = np.zeros(len(days), dtype=np.int64)
+        self.rollover[1:] = np.busday_count(days[:-1], days[1:]) + 2 * np.busday_count(days[:-1], days[1:], weekmask=swap_day)
+        self.swap_units = np.cumsum(self.rollover)
+
     def get_rate(self) -> Dict:
         '''
         Instructment.get_rate(): Getting the price rates for the symbol, those rates can be used in trading simulation
@@ -194,3 +213,19 @@ class Symbol:
                      close=rates.close,
                      timeperiod=5)
         self.broker.add_features(symbol = self.info["name"], features = atr, feature_name = "atr")
+
+    def add_zscore(self, features: List[str], window: int = 100) -> List[str]:
+        '''
+        Instructment.add_zscore(features: List[str], window: int) -> List[str]: adding the rolling z-score of the features, e.g. "close" -> "close_z"
+        The constant features (zero standard deviation) are scored 0. Returns the names of the added features.
+        '''
+        assert window > 1, "Invalid window"
+        rates: pd.DataFrame = self.broker.get_data(symbol = self.info["name"], window_size = 0, features = features)
+        rolling = rates.rolling(window)
+        std: pd.DataFrame = rolling.std()
+        zscore: pd.DataFrame = (rates - rolling.mean()) / std.where(std > 0, np.inf)
+        result: List[str] = []
+        for col in zscore.columns:
+            self.broker.add_features(symbol = self.info["name"], features = zscore[col].rename(f"{col}_z"), feature_name = f"{col}_z")
+            result.append(f"{col}_z")
+        return result
@@ -0,0 +1,95 @@
+from typing import Tuple
+import numpy as np
+
+class RunningNormalizer:
+    def __init__(self, size: int, clip: float = 10.0, epsilon: float = 1e-8, dtype: str = "float32") -> None:
+        '''
+        RunningNormalizer(size: int, clip: float, epsilon: float, dtype: str): z-score normalization with the running mean and variance (Welford's algorithm)
+        size: int -> the number of features
+        clip: float -> the normalized values are clipped to [-clip, clip]
+        dtype: str -> the dtype of the normalized values
+        '''
+        assert size > 0, "Invalid number of features"
+        self.size: int = size
+        self.clip: float = clip
+        self.epsilon: float = epsilon
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.count: int = 0
+        self.mean: np.ndarray = np.zeros(size, dtype=np.float64)
+        self.m2: np.ndarray = np.zeros(size, dtype=np.float64)
+        self.std: np.ndarray = np.ones(size, dtype=np.float64)
+        self.frozen: bool = False
+
+        # preallocated buffers, so update() and normalize() will not allocate new arrays in each step
+        self.delta: np.ndarray = np.zeros(size, dtype=np.float64)
+        self.buffer: np.ndarray = np.zeros((1, size), dtype=self.dtype)
+
+    def update(self, x: np.ndarray) -> None:
+        '''
+        RunningNormalizer.update(x: np.ndarray): adding one sample of all the features to the running statistics, it is O(features)
+        '''
+        if self.frozen:
+            return
+        assert x.shape == (self.size,), "Invalid sample shape"
+        self.count += 1
+        np.subtract(x, self.mean, out=self.delta)
+        self.mean += self.delta / self.count
+        self.m2 += self.delta * (x - self.mean)
+        np.divide(self.m2, self.count, out=self.std)
+        np.sqrt(self.std, out=self.std)
+        self.std += self.epsilon
+
+    def normalize(self, x: np.ndarray) -> np.ndarray:
+        '''
+        RunningNormalizer.normalize(x: np.ndarray) -> np.ndarray: normalizing the samples (rows) of x into the preallocated buffer,
+        the returned array is overwritten by the next call
+        '''
+        x = x.reshape(-1, self.size)
+        if self.buffer.shape != x.shape:
+            self.buffer = np.zeros(x.shape, dtype=self.dtype)
+        np.subtract(x, self.mean, out=self.buffer, casting="unsafe")
+        np.divide(self.buffer, self.std, out=self.buffer, casting="unsafe")
+        np.clip(self.buffer, -self.clip, self.clip, out=self.buffer)
+        return self.buffer
+
+    def freeze(self, frozen: bool = True) -> None:
+        '''
+        RunningNormalizer.freeze(frozen: bool): stop (or resume) updating the statistics, e.g. for evaluation and inference
+        '''
+        self.frozen = frozen
+
+    def get_state(self) -> Tuple:
+        '''
+        RunningNormalizer.get_state() -> Tuple: copies of the running statistics, e.g. for FxEnv.snapshot()
+        '''
+        return (self.count, self.mean.copy(), self.m2.copy(), self.std.copy())
+
+    def set_state(self, state: Tuple) -> None:
+        '''
+        RunningNormalizer.set_state(state: Tuple): restoring the running statistics captured by get_state() into the existing arrays
+        '''
+        self.count = state[0]
+        self.mean[:], self.m2[:], self.std[:] = state[1], state[2], state[3]
+
+    @staticmethod
+    def get_path(name: str) -> str:
+        '''
+        RunningNormalizer.get_path(name: str) -> str: adding the .npz extension when it is missing, so save() and load() use the same file
+        '''
+        return name if name.endswith(".npz") else name + ".npz"
+
+    def save(self, name: str) -> None:
+        '''
+        RunningNormalizer.save(name: str): save the statistics to a npz file, e.g. next to the saved model
+        '''
+        np.savez(RunningNormalizer.get_path(name), count=self.count, mean=self.mean, m2=self.m2, std=self.std, clip=self.clip)
+
+    def load(self, name: str) -> None:
+        '''
+        RunningNormalizer.load(name: str): load the statistics from a npz file and freeze the normalizer
+        '''
+        tmp = np.load(RunningNormalizer.get_path(name))
+        assert tmp["mean"].shape == (self.size,), "Normalizer size not match"
+        self.set_state((int(tmp["count"]), tmp["mean"], tmp["m2"], tmp["std"]))
+        self.clip = float(tmp["clip"])
+        self.freeze()
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from broker import Broker
 from config import AssetType, Config, Op
@@ -25,7 +25,8 @@ class Order:
         
         self.open_price: float = rates["open"] + spread
         self.commission: float = self.symbol.info["commission"] * self.lots
-        self.last_swap: datetime = rates["dt"]
+        # the bar of opening the order, the swap is accrued from the rollovers after this bar
+        self.open_shift: int = self.symbol.broker.shift
         self.swap: float = 0
         self.margin: float = self.comp_margin(applied_price)
         self.pnl: float = 0
@@ -72,11 +73,10 @@ class Order:
         return round(result, 2)
 
     def comp_swap(self) -> None:
-        rates: Dict = self.symbol.get_rate()
-        if rates["dt_close"]  - self.last_swap >= timedelta(days=1):
-            multiplier: int = 3 if rates["dt_close"].weekday() == self.symbol.info["swap_day"] else 1
-            swap_rate: float = self.symbol.info["swap_long"] if self.position == Op.LONG else self.symbol.info["swap_short"]
-            self.swap += round(multiplier * swap_rate * self.lots, 2)
+        # the number of rollovers (triple on the swap day) between the open bar and the current bar, see Symbol.set_rollover()
+        units: int = self.symbol.swap_units[self.symbol.broker.shift] - self.symbol.swap_units[self.open_shift]
+        swap_rate: float = self.symbol.info["swap_long"] if self.position == Op.LONG else self.symbol.info["swap_short"]
+        self.swap = round(units * swap_rate * self.lots, 2)
 
     def close(self, applied_price="open") -> bool:
         assert not self.closed, f"Order Id: {self.id} already closed."
@@ -88,6 +88,8 @@ class Order:
 
         self.close_price = rates[applied_price] + spread
         self.close_time = rates["dt"]
+        # charging the rollovers up to the closing bar
+        self.comp_swap()
         self.pnl = round((self.close_price - self.open_price) * multiplier - self.commission - self.swap, 2)
         self.max_fl = min(self.max_fl, self.pnl)
         self.max_fp = max(self.max_fp, self.pnl)
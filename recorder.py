@@ -0,0 +1,204 @@
+from os import path
+from typing import Callable, List, Dict
+import gym
+import json
+import os
+import numpy as np
+
+# The fields of a transition, obs is the observation which the action is taken on
+FIELDS: List[str] = ["obs", "action", "reward", "done", "truncated", "info"]
+
+
+class TransitionRecorder(gym.Wrapper):
+    def __init__(self, env: gym.Env, folder: str, shard_size: int = 1000000, info_keys: List[str] = []) -> None:
+        '''
+        TransitionRecorder(env: gym.Env, folder: str, shard_size: int, info_keys: List[str]):
+        Streaming the transitions (obs, action, reward, done, info) of the env into preallocated memory-mapped .npy shards
+        folder: str -> the folder of the shards and the index.json, the new shards are appended to an existing dataset in the folder
+        shard_size: int -> the number of transitions in each shard, a new shard is created when the current shard is full
+        info_keys: List[str] -> the numeric info values to be recorded, the missing values are recorded as nan
+        '''
+        super().__init__(env)
+        assert shard_size > 0, "Invalid shard size"
+        self.folder: str = folder
+        self.shard_size: int = shard_size
+        self.info_keys: List[str] = info_keys
+        self.shards: List[Dict] = []
+        self.arrays: Dict = None
+        self.count: int = 0
+        self.last_obs: np.ndarray = None
+        self.last_done: bool = True
+        os.makedirs(folder, exist_ok=True)
+
+        # continuing the shard numbering of an existing dataset, so the recorded transitions are never overwritten
+        if path.exists(path.join(folder, "index.json")):
+            with open(path.join(folder, "index.json")) as f:
+                index: Dict = json.load(f)
+            assert index["info_keys"] == self.info_keys, "Info keys not match the existing dataset"
+            self.shards = index["shards"]
+
+    def get_shapes(self) -> Dict:
+        result: Dict = {
+            "obs": (self.observation_space.shape, self.observation_space.dtype),
+            "action": (self.action_space.shape, self.action_space.dtype),
+            "reward": ((), np.float32),
+            "done": ((), np.bool_),
+            "truncated": ((), np.bool_),
+            "info": ((len(self.info_keys),), np.float64)}
+        return result
+
+    def roll(self) -> None:
+        '''
+        TransitionRecorder.roll(): flushing the current shard and creating a new one
+        '''
+        self.flush()
+        name: str = f"shard-{len(self.shards):05d}"
+        self.arrays = {}
+        for field, (shape, dtype) in self.get_shapes().items():
+            self.arrays[field] = np.lib.format.open_memmap(
+                path.join(self.folder, f"{name}-{field}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(self.shard_size,) + tuple(shape))
+        self.shards.append({"name": name, "count": 0})
+        self.count = 0
+
+    def flush(self) -> None:
+        '''
+        TransitionRecorder.flush(): writing the current shard and the index to disk, it is called at each episode end
+        '''
+        if self.arrays is None:
+            return
+        for arr in self.arrays.values():
+            arr.flush()
+        self.shards[-1]["count"] = self.count
+        index: Dict = {
+            "shards": self.shards,
+            "fields": FIELDS,
+            "info_keys": self.info_keys}
+        with open(path.join(self.folder, "index.json"), "w") as f:
+            json.dump(index, f)
+
+    def add(self, obs: np.ndarray, action, reward: float, done: bool, info: Dict) -> None:
+        '''
+        TransitionRecorder.add(obs, action, reward, done, info): writing one transition into the current shard
+        '''
+        if self.arrays is None or self.count == self.shard_size:
+            self.roll()
+        i: int = self.count
+        self.arrays["obs"][i] = obs
+        self.arrays["action"][i] = action
+        self.arrays["reward"][i] = reward
+        self.arrays["done"][i] = done
+        self.arrays["truncated"][i] = False
+        for j, key in enumerate(self.info_keys):
+            self.arrays["info"][i, j] = info.get(key, np.nan)
+        self.count += 1
+
+    def truncate(self) -> None:
+        '''
+        TransitionRecorder.truncate(): marking the last transition as truncated when the episode is cut before done,
+        the next recorded observation (of this or a later session) will not be its successor
+        '''
+        if not self.last_done and self.count > 0:
+            self.arrays["truncated"][self.count - 1] = True
+        self.last_done = True
+
+    def reset(self, **kwargs):
+        self.truncate()
+        # updating the index at the end of each episode, so a crash loses at most the current episode
+        self.flush()
+        self.last_obs = self.env.reset(**kwargs)
+        self.last_done = False
+        return self.last_obs
+
+    def step(self, action):
+        assert self.last_obs is not None, "Env is not reset"
+        obs, reward, done, info = self.env.step(action)
+        self.add(self.last_obs, action, reward, done, info)
+        self.last_obs = obs
+        self.last_done = done
+        return obs, reward, done, info
+
+    def close(self) -> None:
+        self.truncate()
+        self.flush()
+        return super().close()
+
+
+def rollout(env: TransitionRecorder, policy: Callable[[np.ndarray], int], steps: int) -> None:
+    '''
+    rollout(env: TransitionRecorder, policy: Callable, steps: int): recording the transitions of a policy, e.g. a rule based strategy replayed over the broker data
+    policy: Callable -> taking the observation and returning the action
+    The recorder is closed at the end, the unfinished episode is marked as truncated
+    '''
+    obs = env.reset()
+    for _ in range(steps):
+        obs, _, done, _ = env.step(policy(obs))
+        if done:
+            obs = env.reset()
+    env.close()
+
+
+class TransitionDataset:
+    def __init__(self, folder: str) -> None:
+        '''
+        TransitionDataset(folder: str): reading the shards written by TransitionRecorder, the shards are memory-mapped and never loaded into RAM as a whole
+        '''
+        assert path.exists(path.join(folder, "index.json")), "index.json not exists"
+        with open(path.join(folder, "index.json")) as f:
+            index: Dict = json.load(f)
+        self.info_keys: List[str] = index["info_keys"]
+        self.shards: List[Dict] = []
+        counts: List[int] = []
+        for shard in index["shards"]:
+            if shard["count"] == 0:
+                continue
+            self.shards.append({field: np.load(path.join(folder, f"{shard['name']}-{field}.npy"), mmap_mode="r") for field in index["fields"]})
+            counts.append(shard["count"])
+        self.counts: np.ndarray = np.array(counts, dtype=np.int64)
+
+        # the global index of the first transition of each shard
+        self.offsets: np.ndarray = np.concatenate([[0], np.cumsum(self.counts)])
+        self.size: int = int(self.offsets[-1])
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get_shard(self, idx: int) -> Dict:
+        '''
+        TransitionDataset.get_shard(idx: int) -> Dict: the memory-mapped arrays (zero copy) of the recorded transitions in the shard
+        '''
+        return {field: arr[:self.counts[idx]] for field, arr in self.shards[idx].items()}
+
+    def get(self, idx: np.ndarray, next_obs: bool = False) -> Dict:
+        '''
+        TransitionDataset.get(idx: np.ndarray, next_obs: bool) -> Dict: gathering the transitions of the global indices, only the selected rows are read from disk
+        next_obs: bool -> adding the next observation, it is only valid where the "valid" mask is True (not done, not truncated and not the last transition)
+        '''
+        assert self.size > 0, "Dataset is empty"
+        idx = np.asarray(idx, dtype=np.int64)
+        assert len(idx) == 0 or (idx.min() >= 0 and idx.max() < self.size), "Index out of range"
+        shard: np.ndarray = np.searchsorted(self.offsets, idx, side="right") - 1
+        local: np.ndarray = idx - self.offsets[shard]
+
+        result: Dict = {field: np.empty((len(idx),) + arr.shape[1:], dtype=arr.dtype) for field, arr in self.shards[0].items()}
+        for s in np.unique(shard):
+            mask: np.ndarray = shard == s
+            for field, arr in self.shards[s].items():
+                result[field][mask] = arr[local[mask]]
+
+        if next_obs:
+            following: np.ndarray = np.minimum(idx + 1, self.size - 1)
+            result["next_obs"] = self.get(following)["obs"]
+            result["valid"] = ~result["done"] & ~result["truncated"] & (idx + 1 < self.size)
+        return result
+
+    def sample(self, batch_size: int, next_obs: bool = False, rng: np.random.Generator = None) -> Dict:
+        '''
+        TransitionDataset.sample(batch_size: int, next_obs: bool, rng: np.random.Generator) -> Dict: a random minibatch across all shards
+        '''
+        rng = rng or np.random.default_rng()
+        # sorting the indices, so the rows are read in the order on disk
+        idx: np.ndarray = np.sort(rng.integers(0, self.size, batch_size))
+        return self.get(idx, next_obs)
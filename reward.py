@@ -0,0 +1,114 @@
+from abc import ABC, abstractmethod
+from account import Account
+from config import Config, RewardMode
+from typing import Dict
+import numpy as np
+
+class RewardScheme(ABC):
+    '''
+    RewardScheme: the base class of the reward schemes, each scheme keeps its own incremental state, so the reward is O(1) per step
+    '''
+    def __init__(self, params: Dict = {}) -> None:
+        self.params: Dict = params
+        self.prev_equity: float = Config.account["balance"]
+
+    def reset(self, account: Account) -> None:
+        '''
+        RewardScheme.reset(account: Account): reset the state at the beginning of an episode
+        '''
+        self.prev_equity = account.equity
+
+    @abstractmethod
+    def get_reward(self, account: Account) -> float:
+        '''
+        RewardScheme.get_reward(account: Account) -> float: the reward of the current step, it is called once after each account action
+        '''
+
+    def get_return(self, account: Account) -> float:
+        '''
+        RewardScheme.get_return(account: Account) -> float: the equity return since the last step
+        '''
+        result: float = (account.equity - self.prev_equity) / self.prev_equity
+        self.prev_equity = account.equity
+        return result
+
+
+class EquityDelta(RewardScheme):
+    def get_reward(self, account: Account) -> float:
+        result: float = (account.equity - self.prev_equity) / account.equity
+        self.prev_equity = account.equity
+        return result
+
+
+class LogReturn(RewardScheme):
+    def get_reward(self, account: Account) -> float:
+        result: float = np.log(account.equity / self.prev_equity)
+        self.prev_equity = account.equity
+        return result
+
+
+class DifferentialSharpe(RewardScheme):
+    '''
+    DifferentialSharpe: the differential Sharpe ratio (Moody & Saffell), the exponential moving averages of the return and the squared return are updated with rate params["eta"]
+    '''
+    def __init__(self, params: Dict = {}) -> None:
+        super().__init__(params)
+        self.a: float = 0.0
+        self.b: float = 0.0
+
+    def reset(self, account: Account) -> None:
+        super().reset(account)
+        self.a = 0.0
+        self.b = 0.0
+
+    def get_reward(self, account: Account) -> float:
+        eta: float = self.params.get("eta", 0.01)
+        r: float = self.get_return(account)
+        da: float = r - self.a
+        db: float = r * r - self.b
+        var: float = self.b - self.a * self.a
+        result: float = (self.b * da - 0.5 * self.a * db) / var ** 1.5 if var > 0 else 0.0
+        self.a += eta * da
+        self.b += eta * db
+        return result
+
+
+class DrawdownPenalized(RewardScheme):
+    '''
+    DrawdownPenalized: the equity return minus params["penalty"] times the current drawdown from the equity peak of the episode
+    '''
+    def __init__(self, params: Dict = {}) -> None:
+        super().__init__(params)
+        self.peak: float = Config.account["balance"]
+
+    def reset(self, account: Account) -> None:
+        super().reset(account)
+        self.peak = account.equity
+
+    def get_reward(self, account: Account) -> float:
+        r: float = self.get_return(account)
+        self.peak = max(self.peak, account.equity)
+        dd: float = (self.peak - account.equity) / self.peak
+        return r - self.params.get("penalty", 1.0) * dd
+
+
+class RealizedPnL(RewardScheme):
+    '''
+    RealizedPnL: the pnl of the orders closed in the current step, relative to the initial balance
+    '''
+    def get_reward(self, account: Account) -> float:
+        return account.last_pnl / Config.account["balance"]
+
+
+def get_reward_scheme(mode: RewardMode, params: Dict = {}) -> RewardScheme:
+    '''
+    get_reward_scheme(mode: RewardMode, params: Dict) -> RewardScheme: creating the reward scheme selected in Config.env["reward"]
+    '''
+    schemes: Dict = {
+        RewardMode.EQUITY_DELTA: EquityDelta,
+        RewardMode.LOG_RETURN: LogReturn,
+        RewardMode.DIFF_SHARPE: DifferentialSharpe,
+        RewardMode.DRAWDOWN: DrawdownPenalized,
+        RewardMode.REALIZED_PNL: RealizedPnL}
+    assert mode in schemes, "Invalid reward mode"
+    return schemes[mode](params)
@@ -0,0 +1,195 @@
+from config import Config, SpreadMode
+from typing import List, Dict, Set
+import os
+
+# The thread limits must be set before numpy, pandas, talib and torch are imported, the forked workers inherit the thread pools of the parent
+_thread_vars: List[str] = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"]
+for var in _thread_vars:
+    os.environ[var] = str(Config.runner["threads_per_worker"])
+
+from analytics import from_account
+from broker import Broker
+from fxenv import FxEnv
+from instrument import Symbol
+from itertools import product
+from os import path
+import copy
+import json
+import multiprocessing as mp
+import numpy as np
+
+# The broker loaded once in the parent process, the forked workers share its memory (copy on write)
+_broker: Broker = None
+
+# The counter used for assigning the cpu cores to each worker
+_core_counter = None
+
+
+def get_folds(broker: Broker, folds: int, anchored: bool = True) -> List[Dict]:
+    '''
+    get_folds(broker: Broker, folds: int, anchored: bool) -> List[Dict]:
+    Splitting broker.dt into walk-forward folds, each fold trains on the bars before its test window
+    anchored: bool -> True: the training window starts from the first bar, False: the training window has the same length as the test window
+    '''
+    assert folds > 0, "Invalid number of folds"
+    bounds: np.ndarray = np.linspace(0, len(broker.dt) - 1, folds + 2).astype(int)
+    result: List[Dict] = []
+    for k in range(folds):
+        result.append({
+            "fold": k,
+            "train": [0 if anchored else int(bounds[k]), int(bounds[k+1])],
+            "test": [int(bounds[k+1]), int(bounds[k+2])]})
+    return result
+
+
+def get_tasks(broker: Broker) -> List[Dict]:
+    '''
+    get_tasks(broker: Broker) -> List[Dict]: expanding the grid in Config.runner into one task per configuration and fold
+    '''
+    grid: Dict = Config.runner["grid"]
+    folds: List[Dict] = get_folds(broker, Config.runner["folds"], Config.runner["anchored"])
+    result: List[Dict] = []
+    for symbol, algorithm, window_size, spread_mode, features, fold in product(
+        grid["symbol"], grid["algorithm"], grid["window_size"], grid["spread_mode"], grid["features"], folds):
+        task: Dict = {
+            "symbol": symbol,
+            "algorithm": algorithm,
+            "window_size": window_size,
+            "spread_mode": int(spread_mode),
+            "features": list(features),
+            **fold}
+        task["key"] = f"{symbol}-{algorithm}-w{window_size}-s{SpreadMode(spread_mode).name}-f{'+'.join(features) or 'none'}-k{fold['fold']}"
+        result.append(task)
+    return result
+
+
+def get_completed(results: str) -> Set[str]:
+    '''
+    get_completed(results: str) -> Set[str]: reading the keys of the finished tasks from the results file, so an interrupted sweep can resume
+    '''
+    result: Set[str] = set()
+    if path.exists(results):
+        with open(results) as f:
+            for line in f:
+                try:
+                    result.add(json.loads(line)["key"])
+                except (ValueError, KeyError):
+                    # a partially written line from an interrupted sweep
+                    pass
+    return result
+
+
+def fork_broker() -> Broker:
+    '''
+    fork_broker() -> Broker: a shallow copy of the shared broker, the features added by a task will not leak into the shared price data
+    '''
+    assert _broker is not None, "Broker is not loaded"
+    broker: Broker = copy.copy(_broker)
+    broker.data = [{"symbol": d["symbol"], "df": d["df"].copy(deep=False)} for d in _broker.data]
+    return broker
+
+
+def init_worker(threads: int) -> None:
+    '''
+    init_worker(threads: int): pinning the worker to its own cpu cores and limiting the torch threads, so the workers will not oversubscribe the cpu.
+    The BLAS thread pools are already limited by the environment variables set at the import of this module
+    '''
+    if hasattr(os, "sched_setaffinity"):
+        with _core_counter.get_lock():
+            idx: int = _core_counter.value
+            _core_counter.value += 1
+        cores: List[int] = sorted(os.sched_getaffinity(0))
+        # run() caps the workers to the available cores, a replacement worker beyond the cores is not pinned rather than sharing cores
+        first: int = idx * threads
+        if first + threads <= len(cores):
+            os.sched_setaffinity(0, cores[first:first + threads])
+
+    import torch
+    torch.set_num_threads(threads)
+
+
+def run_task(task: Dict) -> Dict:
+    '''
+    run_task(task: Dict) -> Dict: training the model on the train window of the fold and evaluating it on the test window
+    '''
+    from stable_baselines3.a2c import A2C
+    from stable_baselines3.dqn import DQN
+    from stable_baselines3.ppo import PPO
+    from stable_baselines3.common.vec_env.dummy_vec_env import DummyVecEnv
+    algorithms: Dict = {"A2C": A2C, "DQN": DQN, "PPO": PPO}
+    assert task["algorithm"] in algorithms, f"Invalid algorithm {task['algorithm']}"
+
+    np.random.seed(Config.runner["seed"])
+    broker: Broker = fork_broker()
+    symbol: Symbol = Symbol(broker, task["symbol"])
+    # copying the symbol details, so the spread mode of the task will not change the Config class
+    symbol.info = dict(symbol.info, spread_mode=SpreadMode(task["spread_mode"]))
+    for feature in task["features"]:
+        getattr(symbol, f"add_{feature}")()
+
+    fx: FxEnv = FxEnv(
+        broker=broker,
+        symbol=symbol,
+        window_size=task["window_size"],
+        start=task["train"][0],
+        end=task["train"][1])
+    env = DummyVecEnv(env_fns=[lambda: fx])
+    model = algorithms[task["algorithm"]]("MlpPolicy", env, seed=Config.runner["seed"], verbose=0)
+    model.learn(total_timesteps=Config.runner["total_timesteps"])
+    model.save(path.join(Config.runner["models"], task["key"]))
+    if fx.normalizer is not None:
+        # evaluating with the training statistics
+        fx.normalizer.freeze()
+        fx.normalizer.save(path.join(Config.runner["models"], task["key"]))
+
+    fx.set_range(task["test"][0], task["test"][1])
+    obs = fx.reset()
+    done: bool = False
+    while not done:
+        action, _ = model.predict(obs, deterministic=True)
+        obs, _, done, _ = fx.step(int(action))
+
+    result: Dict = {
+        "key": task["key"],
+        "task": task,
+        "total_rewards": float(fx.total_rewards),
+        "performance": from_account(fx.account),
+        **fx.account.info()}
+    return result
+
+
+def run() -> None:
+    '''
+    run(): running all the tasks in Config.runner["grid"] in a process pool sharing one loaded dataset, the tasks already in the results file are skipped
+    '''
+    global _broker, _core_counter
+    _broker = Broker()
+
+    tasks: List[Dict] = get_tasks(_broker)
+    completed: Set[str] = get_completed(Config.runner["results"])
+    tasks = [t for t in tasks if t["key"] not in completed]
+    print(f"Tasks: {len(tasks)}. Completed: {len(completed)}")
+    if len(tasks) == 0:
+        return
+
+    threads: int = Config.runner["threads_per_worker"]
+    cores: int = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else mp.cpu_count()
+    # each worker has its own threads_per_worker cores, more workers would oversubscribe the cpu
+    slots: int = max(1, cores // threads)
+    workers: int = min(Config.runner["workers"] or slots, slots, len(tasks))
+    os.makedirs(Config.runner["models"], exist_ok=True)
+    os.makedirs(path.dirname(Config.runner["results"]) or ".", exist_ok=True)
+
+    ctx = mp.get_context("fork")
+    _core_counter = ctx.Value("i", 0)
+    with ctx.Pool(processes=workers, initializer=init_worker, initargs=(threads,)) as pool:
+        with open(Config.runner["results"], "a") as f:
+            for result in pool.imap_unordered(run_task, tasks):
+                f.write(json.dumps(result, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                print(f"Done: {result['key']}. Total Rewards: {result['total_rewards']}")
+
+
+if __name__ == "__main__":
+    run()